@@ -0,0 +1,60 @@
+"""Generate pdftocgen/_default_recipe.py from recipes/default.toml
+
+The default recipe is shipped as a python module, so loading it is a plain
+import that python can serve from its bytecode cache, with no toml parsing.
+Run this (or `make default-recipe`) whenever recipes/default.toml changes.
+"""
+
+import os
+
+from pdftocgen.recipeio import read_recipe
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "recipes", "default.toml")
+DEST = os.path.join(ROOT, "pdftocgen", "_default_recipe.py")
+
+HEADER = '''"""The default recipe, precompiled from recipes/default.toml
+
+Loading this module is much cheaper than parsing the toml file, since python
+caches the bytecode. Generated by build.py, do not edit by hand.
+"""
+
+'''
+
+
+def format_value(value, indent: int = 0) -> str:
+    """Format a parsed recipe as python source, one entry per line
+
+    Containers of plain values are kept on a single line. Keys stay in the
+    order of the toml file, whatever the python version.
+    """
+    nested = isinstance(value, (dict, list)) and any(
+        isinstance(v, (dict, list))
+        for v in (value.values() if isinstance(value, dict) else value)
+    )
+    if not nested:
+        return repr(value)
+
+    pad = "    " * (indent + 1)
+    if isinstance(value, dict):
+        items = [f"{pad}{k!r}: {format_value(v, indent + 1)},"
+                 for k, v in value.items()]
+        brackets = "{}"
+    else:
+        items = [f"{pad}{format_value(v, indent + 1)},"
+                 for v in value]
+        brackets = "[]"
+    return (brackets[0] + "\n" + "\n".join(items) + "\n" +
+            "    " * indent + brackets[1])
+
+
+def main():
+    # parsed exactly like a recipe given on the command line
+    recipe = read_recipe(SRC)
+    with open(DEST, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        f.write("RECIPE = " + format_value(recipe) + "\n")
+
+
+if __name__ == "__main__":
+    main()
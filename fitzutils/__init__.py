@@ -5,6 +5,11 @@ from .fitzutils import (
     ToCEntry,
     dump_toc,
     pprint_toc,
+    can_reopen,
+    pick_jobs,
+    map_page_ranges,
+    get_page_dict,
+    extract_page_dict,
     get_file_encoding
 )
 
@@ -13,5 +18,10 @@ __all__ = [
     'ToCEntry',
     'dump_toc',
     'pprint_toc',
+    'can_reopen',
+    'pick_jobs',
+    'map_page_ranges',
+    'get_page_dict',
+    'extract_page_dict',
     'get_file_encoding'
 ]
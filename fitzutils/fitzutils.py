@@ -1,9 +1,14 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional, ContextManager, List, Tuple
+from itertools import chain
+from typing import Any, Callable, Optional, ContextManager, List, Tuple
 from fitz import Document
 
+import os
 import sys
+import weakref
 import fitz
 import io
 import csv
@@ -96,6 +101,152 @@ def pprint_toc(entries: List[ToCEntry]) -> str:
     ])
 
 
+def extract_page_dict(page: fitz.Page) -> dict:
+    """Get the text of a page as a dict, like `TextPage.extractDICT`
+
+    The text page lives in MuPDF's heap and is freed with its python
+    wrapper, so the only reference to it is dropped as soon as the dict is
+    extracted.
+    """
+    tp = page.get_textpage()
+    try:
+        return tp.extractDICT()
+    finally:
+        del tp
+
+
+# number of page dicts kept for each open document
+PAGE_CACHE_SIZE: int = 64
+
+# the extracted page dicts of each open document, by page number, in least
+# recently used order. documents are weakly referenced, so their pages are
+# dropped once they are garbage collected
+_page_cache: "weakref.WeakKeyDictionary[Document, OrderedDict]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_page_dict(doc: Document, pno: int) -> dict:
+    """Get the text of a page as a dict, like `TextPage.extractDICT`
+
+    Laying out the text of a page is expensive, and the same pages are often
+    read several times (e.g. by pdfxmeta, then by pdftocgen), so the result
+    is cached for the last PAGE_CACHE_SIZE pages of each document. The dict
+    is shared between callers and must not be modified.
+
+    Arguments
+      doc: a pdf document
+      pno: page number (0-based index)
+    """
+    if doc.is_dirty:
+        # the page may have changed since it was cached
+        return extract_page_dict(doc[pno])
+
+    pages = _page_cache.get(doc)
+    if pages is None:
+        pages = _page_cache[doc] = OrderedDict()
+    elif pno in pages:
+        pages.move_to_end(pno)
+        return pages[pno]
+
+    page_dict = extract_page_dict(doc[pno])
+    pages[pno] = page_dict
+    if len(pages) > PAGE_CACHE_SIZE:
+        pages.popitem(last=False)
+    return page_dict
+
+
+def can_reopen(doc: Document) -> bool:
+    """Check if another process could open an identical copy of `doc`
+
+    Documents can't be sent to worker processes, so the workers have to open
+    the file again by themselves. This is only safe if `doc` is an unmodified,
+    unencrypted file on disk.
+
+    A document unlocked with `authenticate` is no longer `is_encrypted`, and
+    reading `needs_pass` then would throw away its key (PyMuPDF 1.22 retries
+    the empty password), so the encryption method in the metadata is checked
+    instead.
+    """
+    return (bool(doc.name) and os.path.isfile(doc.name) and
+            not doc.is_dirty and not doc.is_encrypted and
+            not (doc.metadata or {}).get('encryption'))
+
+
+# upper bound of worker processes when one per cpu is asked for
+MAX_JOBS: int = 8
+
+
+def pick_jobs(jobs: Optional[int], n: int) -> int:
+    """Number of worker processes to use for `n` independent pieces of work
+
+    Arguments
+      jobs: number of worker processes asked for. if None is given, use one
+            per cpu (up to MAX_JOBS).
+      n: number of pieces of work, there is no point in more workers
+    """
+    if jobs is None:
+        jobs = min(os.cpu_count() or 1, MAX_JOBS)
+    return min(jobs, n)
+
+
+def _run_page_range(job: Tuple[str, Callable, tuple, int, int]) -> List[Any]:
+    """Run `fn(doc, start, stop, *args)` on a pdf file
+
+    This runs in a worker process, which opens the file again by itself.
+    """
+    path, fn, args, start, stop = job
+    doc = fitz.open(path)
+    try:
+        return fn(doc, start, stop, *args)
+    finally:
+        doc.close()
+
+
+def map_page_ranges(doc: Document,
+                    fn: Callable[..., List[Any]],
+                    args: tuple = (),
+                    jobs: Optional[int] = 1) -> List[Any]:
+    """Run `fn(doc, start, stop, *args)` over all the pages of a document
+
+    The pages are split into ranges [start, stop) that are processed by worker
+    processes, and the results are concatenated in page order. The document
+    is processed in this process instead if there is a single job, or if the
+    workers can't reopen it (see `can_reopen`).
+
+    Arguments
+      doc: a pdf document
+      fn: a module level function returning a list, so it can be sent to the
+          workers. `args` must be picklable too.
+      args: extra arguments of `fn`
+      jobs: number of worker processes, 1 by default. if None is given, use
+            one per cpu (up to MAX_JOBS). each worker is a new interpreter
+            that imports PyMuPDF and opens the file again under the spawn
+            start method (macOS, Windows), so this only pays off for
+            documents that take much longer to process than that.
+    Returns
+      the concatenated results of `fn`
+    """
+    n = doc.page_count
+
+    jobs = pick_jobs(jobs, n)
+
+    if jobs <= 1 or not can_reopen(doc):
+        return fn(doc, 0, n, *args)
+
+    # a few ranges per worker to even out the load
+    nranges = min(jobs * 4, n)
+    bounds = [n * i // nranges for i in range(nranges + 1)]
+    ranges = [
+        (doc.name, fn, args, start, stop)
+        for start, stop in zip(bounds, bounds[1:])
+    ]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(chain.from_iterable(
+            executor.map(_run_page_range, ranges)
+        ))
+
+
 def get_file_encoding(path: str) -> str:
     """Get encoding of file
 
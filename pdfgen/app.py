@@ -1,28 +1,21 @@
 import sys
-import getopt
 import pdftocgen
-import argparse
-import io
-import pdftocio
 import os.path
-import toml
-
-from typing import Optional, TextIO
-from fitzutils import open_pdf, dump_toc, pprint_toc, get_file_encoding
-from pdftocgen.tocgen import gen_toc
-from pdftocio.tocparser import parse_toc
-from pdftocio.tocio import write_toc, read_toc
-import io
-import os
-import toml
-from pdfxmeta.app import main as pdfxmeta_main
+
+from textwrap import indent
+from typing import List, Optional
+from pdftocgen.cliutils import ErrorTable, lazy, lookup_error
+
+# the pdf related modules pull in PyMuPDF, which is expensive to import, so
+# they are imported inside the functions that need them. this keeps --help and
+# --version fast.
 
 usage_s = """
-usage: pdfgen [options] doc.pdf
+usage: pdfgen [options] doc.pdf [doc.pdf ...]
 """.strip()
 
 help_s = """
-usage: pdfgen [options] doc.pdf
+usage: pdfgen [options] doc.pdf [doc.pdf ...]
 
 Generate PDF table of contents from a recipe file.
 
@@ -41,6 +34,17 @@ or alternatively use the -r flag
 
 The output of this command is a new pdf file with the table of contents added.
 
+To process many pdfs with the same recipe, pass all of them
+at once, or list them in a file with the -b flag. the recipe
+and the pdf libraries are then only loaded once
+
+    $ pdfgen -r recipe.toml a.pdf b.pdf c.pdf
+    $ pdfgen -r recipe.toml -b list.txt
+
+Use the -j flag to process several of them in parallel
+
+    $ pdfgen -r recipe.toml -j 4 -b list.txt
+
 If you only need a readable format of the table of contents,
 use the -H flag
 
@@ -50,34 +54,57 @@ This format cannot be parsed by pdftocio, but it is slightly
 more readable.
 
 arguments
-  doc.pdf                   path to the input PDF document
+  doc.pdf                   path to the input PDF documents
 
 options
   -h, --help                show help
   -r, --recipe=recipe.toml  path to the recipe file. if this flag is
-                            not specified, the default is stdin
-  -H, --human-readable      print the toc in a readable format
+                            not specified, the default is stdin. if
+                            nothing is piped or redirected to stdin,
+                            or stdin is used by -b -, the default
+                            recipe is used
+  -H, --human-readable      print the toc in a readable format. with
+                            several input pdfs, each toc is printed
+                            under the path of its pdf
   -v, --vpos                if this flag is set, the vertical position
                             of each heading will be generated in the
                             output
   -o, --out=file            path to the output file. if this flag is
-                            not specified, the default is {input}_out.pdf
+                            not specified, the default is {input}_out.pdf.
+                            only valid with a single input pdf
+  -b, --batch=list.txt      path to a file listing the input pdfs, one
+                            per line. use - to read the list from stdin
+  -j, --jobs=n              number of processes to use. documents are
+                            processed in parallel, each in its own
+                            process, or the pages of a single input
+                            pdf are split between them. the default
+                            is 1
+  -f, --fast-save           add the toc to doc.pdf in place using an
+                            incremental save, which only appends the
+                            new outline. cannot be used with -o
   -g, --debug               enable debug mode
   -V, --version             show version number
 """.strip()
 
 def create_parser():
-    parser = argparse.ArgumentParser(prog='pdfgen', description='Generate PDF table of contents from a recipe file.')
-    parser.add_argument('pdf_path', metavar='doc.pdf', help='path to the input PDF document')
-    parser.add_argument('-r', '--recipe', metavar='recipe.toml', help='path to the recipe file. if this flag is not specified, the default is a generated recipe')
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='pdfgen', description='Generate PDF table of contents from a recipe file.', add_help=False)
+    parser.add_argument('pdf_path', metavar='doc.pdf', nargs='*', help='path to the input PDF documents')
+    parser.add_argument('-r', '--recipe', metavar='recipe.toml', help='path to the recipe file. if this flag is not specified, the default is stdin, or the default recipe if stdin is a terminal or used by -b -')
     parser.add_argument('-H', '--human-readable', action='store_true', help='print the toc in a readable format')
     parser.add_argument('-v', '--vpos', action='store_true', help='if this flag is set, the vertical position of each heading will be generated in the output')
-    parser.add_argument('-o', '--out', metavar='file', help='path to the output file. if this flag is not specified, the default is stdout')
+    parser.add_argument('-o', '--out', metavar='file', help='path to the output file. if this flag is not specified, the default is {input}_out.pdf')
+    parser.add_argument('-b', '--batch', metavar='list.txt', help='path to a file listing the input PDF documents, one per line. use - for stdin')
+    parser.add_argument('-j', '--jobs', metavar='n', type=int, default=1, help='number of processes, across documents or across the pages of a single input pdf. the default is 1')
+    parser.add_argument('-f', '--fast-save', action='store_true', help='add the toc to the input file in place using an incremental save')
     parser.add_argument('-g', '--debug', action='store_true', help='enable debug mode')
     parser.add_argument('-V', '--version', action='store_true', help='show version number')
     parser.add_argument('-h', '--help', action='store_true', help='show help')
     return parser
 
+_get_parser = lazy(create_parser)
+
 def generate_recipe(doc, keywords=""):
     """
     Generates a recipe for the given document.
@@ -94,6 +121,12 @@ def generate_recipe(doc, keywords=""):
     # recipe = pdfxmeta_main(["-a","1",path_in,keywords])
     # return recipe
 
+    try:
+        import tomllib
+    except ImportError:
+        # python < 3.11
+        import tomli as tomllib
+
     # hardcode the recipe for now, will change later
     recipe = """
 [[heading]]
@@ -108,7 +141,7 @@ greedy = true
 font.name = "Times-Bold"
 font.size = 11.9552001953125
 """
-    return toml.loads(recipe)
+    return tomllib.loads(recipe)
 
 def generate_toc_from_recipe(doc, recipe_file):
     """
@@ -121,9 +154,11 @@ def generate_toc_from_recipe(doc, recipe_file):
     Returns:
         The generated table of contents.
     """
-    with open(recipe_file, "r") as f:
-        recipe = toml.loads(recipe_file)
-        return gen_toc(doc, recipe)
+    from pdftocgen.recipeio import read_recipe
+    from pdftocgen.tocgen import gen_toc
+
+    recipe = read_recipe(recipe_file)
+    return gen_toc(doc, recipe)
 
 def add_toc_to_pdf(doc, toc):
     """
@@ -133,127 +168,208 @@ def add_toc_to_pdf(doc, toc):
         doc: The PDF document.
         toc: The table of contents to add.
     """
-    # an input is given, so switch to input mode
-    # toc_file: TextIO = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-    # toc = parse_toc(toc_file)
-    # write_toc(doc, toc)
+    from pdftocio.tocio import write_toc
 
     write_toc(doc, toc)
-    parser.add_argument('-g', '--debug', action='store_true', help='enable debug mode')
-    parser.add_argument('-V', '--version', action='store_true', help='show version number')
-    parser.add_argument('-h', '--help', action='store_true', help='show help')
-    return parser
+
+def _read_batch(path: str) -> List[str]:
+    """Read the list of input pdfs, one path per line, from a batch file"""
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+def _load_recipe(path: Optional[str], stdin_taken: bool = False) -> dict:
+    """Load the recipe from a file, stdin, or fall back to the default one"""
+    from pdftocgen.recipeio import read_recipe, read_recipe_cached
+
+    if path:
+        return read_recipe_cached(path)
+    if not stdin_taken and not sys.stdin.isatty():
+        return read_recipe()
+    # no recipe is given, fall back to the default one, which is precompiled
+    # into a python module to skip the toml parsing
+    from pdftocgen._default_recipe import RECIPE
+    return RECIPE
+
+def _process_one(path_in: str,
+                 recipe: dict,
+                 out: Optional[str] = None,
+                 readable: bool = False,
+                 fast_save: bool = False,
+                 jobs: Optional[int] = 1) -> Optional[str]:
+    """Generate the toc of a single pdf and add it to the document
+
+    Returns the readable toc if `readable` is set, None otherwise.
+    """
+    from fitzutils import open_pdf, pprint_toc
+    from pdftocgen.tocgen import gen_toc
+    from pdftocio.tocio import write_toc
+
+    with open_pdf(path_in) as doc:
+        toc = gen_toc(doc, recipe, jobs)
+        if readable:
+            return pprint_toc(toc)
+        write_toc(doc, toc)
+        if fast_save:
+            # only append the changed objects (the outline) to the end of
+            # the input file instead of rewriting all of it
+            import fitz
+            doc.save(path_in, incremental=True,
+                     encryption=fitz.PDF_ENCRYPT_KEEP)
+        else:
+            if out is None:
+                # add suffix to input name as output
+                pfx, ext = os.path.splitext(path_in)
+                out = f"{pfx}_out{ext}"
+            # the outline doesn't touch the page content, so skip the
+            # garbage collection and recompression passes
+            doc.save(out, garbage=0, deflate=False)
+    return None
+
+# the recipe of a worker process, set once by `_init_worker`
+_worker_recipe: Optional[dict] = None
+
+def _init_worker(recipe: dict):
+    """Load the pdf modules and keep the recipe in a worker process"""
+    global _worker_recipe
+    from importlib import import_module
+
+    # imported for their side effect only, so the first document of the
+    # worker doesn't pay for them
+    for module in ('fitz', 'pdftocgen.tocgen', 'pdftocio.tocio'):
+        import_module(module)
+    _worker_recipe = recipe
+
+def _process_in_worker(args) -> Optional[str]:
+    path_in, readable, fast_save = args
+    # the documents are already spread over the workers, so don't start
+    # another pool for the pages of each one
+    return _process_one(path_in, _worker_recipe, None, readable, fast_save, 1)
+
+def _process_all(paths: List[str],
+                 recipe: dict,
+                 out: Optional[str],
+                 readable: bool,
+                 fast_save: bool,
+                 jobs: int):
+    """Process the input pdfs, in parallel across documents if jobs > 1
+
+    A single document is processed in parallel across its pages instead.
+    """
+    if len(paths) == 1:
+        results = [
+            _process_one(paths[0], recipe, out, readable, fast_save, jobs)
+        ]
+    elif jobs <= 1:
+        # a batch is processed one document after another in this process
+        results = (
+            _process_one(path_in, recipe, out, readable, fast_save)
+            for path_in in paths
+        )
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(paths)),
+                                       initializer=_init_worker,
+                                       initargs=(recipe,))
+        with executor:
+            results = list(executor.map(
+                _process_in_worker,
+                [(path_in, readable, fast_save) for path_in in paths]
+            ))
+
+    # printed here in input order, so the output of the workers doesn't
+    # interleave
+    for path_in, result in zip(paths, results):
+        if result is None:
+            continue
+        if len(paths) > 1:
+            # tell the tocs of different inputs apart
+            result = f"{path_in}:\n{indent(result, '    ')}"
+        print(result)
+
+_ERRORS: ErrorTable = {
+    ValueError: ("", 1),
+    IOError: ("unable to open file: ", 1),
+    KeyboardInterrupt: ("interrupted: ", 1),
+    Exception: ("", 1),
+}
 
 def main():
+    argv = sys.argv[1:]
+
+    # the common no-op invocations are answered before building the parser
+    if argv[:1] in (["-h"], ["--help"]):
+        print(help_s, file=sys.stderr)
+        sys.exit()
+    if argv[:1] in (["-V"], ["--version"]):
+        print("pdfgen", pdftocgen.__version__, file=sys.stderr)
+        sys.exit()
+
     # parse arguments
-    parser = create_parser()
+    parser = _get_parser()
     
     try:
-        opts, args = parser.parse_args(sys.argv[1:])
-    except SystemExit as e:
-        print(e, file=sys.stderr)
+        opts = parser.parse_args(argv)
+    except SystemExit:
         print(usage_s, file=sys.stderr)
         sys.exit(2)
 
-    recipe_file: TextIO = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-    readable: bool = False
-    vpos: bool = False
-    out: Optional[str] = None
-    debug: bool = False
-    
-    if recipe_file.isatty():
+    if opts.help:
+        print(help_s, file=sys.stderr)
+        sys.exit()
+    if opts.version:
+        print("pdfgen", pdftocgen.__version__, file=sys.stderr)
+        sys.exit()
+
+    readable: bool = opts.human_readable
+    vpos: bool = opts.vpos
+    out: Optional[str] = opts.out
+    fast_save: bool = opts.fast_save
+    jobs: int = opts.jobs
+    debug: bool = opts.debug
+
+    if jobs < 1:
+        print("error: --jobs must be at least 1", file=sys.stderr)
+        print(usage_s, file=sys.stderr)
+        sys.exit(1)
+
+    if fast_save and out is not None:
+        print("error: --fast-save writes to the input pdf, it can't be used with -o", file=sys.stderr)
+        print(usage_s, file=sys.stderr)
+        sys.exit(1)
+
+    paths: List[str] = opts.pdf_path
+    if opts.batch:
         try:
-            recipe_file = open("recipes/default.toml", "r", encoding=get_file_encoding("recipes/default.toml"))
+            paths = paths + _read_batch(opts.batch)
         except IOError as e:
-            print("error: can't open default recipe file for reading", file=sys.stderr)
+            print("error: can't open the batch file", file=sys.stderr)
             print(e, file=sys.stderr)
             sys.exit(1)
 
-    for o in opts:
-        if o.long == "--human-readable":
-            readable = True
-        elif o.long == "--vpos":
-            vpos = True
-        elif o.long == "--recipe":
-            try:
-                if opts.recipe:
-                    recipe_file = open(opts.recipe, "r", encoding=get_file_encoding(opts.recipe))
-                else:
-                    recipe_file = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-            except IOError as e:
-                print(f"error: can't open recipe file for reading: {e}", file=sys.stderr)
-                print(e, file=sys.stderr)
-                sys.exit(1)
-        elif o.long == "--out":
-             if opts.out is None:
-                 out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
-             else:
-                try:
-                    out = open(opts.out, "w", encoding='utf-8', errors='ignore')
-                except IOError as e:
-                    print(f"error: can't open out file for writing: {e}", file=sys.stderr)
-                    print(e, file=sys.stderr)
-                    sys.exit(1)
-        elif o.long == "--debug":
-            debug = True
-        elif o.long == "--version":
-            print("pdfgen", pdftocgen.__version__, file=sys.stderr)
-            sys.exit()
-        elif o.long == "--help":
-            print(help_s, file=sys.stderr)
-            sys.exit()
-
-    if len(args) < 1:
+    if not paths:
         print("error: no input pdf is given", file=sys.stderr)
         print(usage_s, file=sys.stderr)
         sys.exit(1)
 
-    path_in: str = args[0]
+    if out is not None and len(paths) > 1:
+        print("error: -o can't be used with more than one input pdf", file=sys.stderr)
+        print(usage_s, file=sys.stderr)
+        sys.exit(1)
     # done parsing arguments
-    
+
     try:
-        with open_pdf(path_in) as doc:
-            if recipe_file.name == "<stdin>":
-                try:
-                    recipe = toml.load(open("recipes/default.toml", "r", encoding=get_file_encoding("recipes/default.toml")))
-                except IOError as e:
-                    print("error: unable to open default recipe", file=sys.stderr)
-                    print(e, file=sys.stderr)
-                    sys.exit(1)
-            else:
-              recipe = toml.load(recipe_file)
-            toc = gen_toc(doc, recipe)
-            if readable:
-                print(pprint_toc(toc), file=out)
-            else:
-                # an input is given, so switch to input mode
-                toc_file: TextIO = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-                toc = parse_toc(toc_file)
-                write_toc(doc, toc)
-                if out is None:
-                    # add suffix to input name as output
-                    pfx, ext = os.path.splitext(path_in)
-                    out = f"{pfx}_out{ext}"
-                doc.save(out)
-                
-
-    except ValueError as e:
+        # the recipe and the pdf modules are loaded once, no matter how many
+        # documents are in the batch
+        recipe = _load_recipe(opts.recipe, opts.batch == '-')
+        _process_all(paths, recipe, out, readable, fast_save, jobs)
+    except tuple(_ERRORS) as e:
         if debug:
-            raise e
-        print(f"error: {e}", file=sys.stderr)
-        sys.exit(1)
-    except IOError as e:
-        if debug:
-            raise e
-        print(f"error: unable to open file: {e}", file=sys.stderr)
-        sys.exit(1)
-    except KeyboardInterrupt as e:
-        if debug:
-            raise e
-        print(f"error: interrupted: {e}", file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        if debug:
-            raise e
-        print(f"error: {e}", file=sys.stderr)
-        sys.exit(1)
+            raise
+        prefix, code = lookup_error(_ERRORS, e)
+        print(f"error: {prefix}{e}", file=sys.stderr)
+        sys.exit(code)
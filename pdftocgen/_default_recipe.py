@@ -0,0 +1,22 @@
+"""The default recipe, precompiled from recipes/default.toml
+
+Loading this module is much cheaper than parsing the toml file, since python
+caches the bytecode. Generated by build.py, do not edit by hand.
+"""
+
+RECIPE = {
+    'heading': [
+        {
+            'level': 1,
+            'font': {'name': 'Times-Bold', 'size': 12},
+        },
+        {
+            'level': 2,
+            'font': {'name': 'Times-Bold', 'size': 11},
+        },
+        {
+            'level': 3,
+            'font': {'name': 'Times-Bold', 'size': 10},
+        },
+    ],
+}
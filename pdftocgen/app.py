@@ -1,27 +1,29 @@
 """The executable of pdftocgen"""
 
-import toml
 import sys
-import argparse
 import pdftocgen
 import io
 
 from typing import TextIO
-from fitzutils import open_pdf, dump_toc, pprint_toc, get_file_encoding
-from .tocgen import gen_toc
+from .cliutils import ErrorTable, lazy, lookup_error
 
 def create_parser():
-    parser = argparse.ArgumentParser(prog='pdftocgen', description='Generate PDF table of contents from a recipe file.')
-    parser.add_argument('pdf_path', metavar='doc.pdf', help='path to the input PDF document')
-    parser.add_argument('-r', '--recipe', metavar='recipe.toml', help='path to the recipe file. if this flag is not specified, the default is stdin')
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='pdftocgen', description='Generate PDF table of contents from a recipe file.', add_help=False)
+    parser.add_argument('pdf_path', metavar='doc.pdf', nargs='?', help='path to the input PDF document')
+    parser.add_argument('-r', '--recipe', metavar='recipe.toml', help='path to the recipe file. if this flag is not specified, the default is stdin, or the default recipe if stdin is a terminal')
     parser.add_argument('-H', '--human-readable', action='store_true', help='print the toc in a readable format')
     parser.add_argument('-v', '--vpos', action='store_true', help='if this flag is set, the vertical position of each heading will be generated in the output')
     parser.add_argument('-o', '--out', metavar='file', help='path to the output file. if this flag is not specified, the default is stdout')
+    parser.add_argument('-j', '--jobs', metavar='n', type=int, default=1, help='number of processes to extract the pages with. the default is 1')
     parser.add_argument('-g', '--debug', action='store_true', help='enable debug mode')
     parser.add_argument('-V', '--version', action='store_true', help='show version number')
     parser.add_argument('-h', '--help', action='store_true', help='show help')
     return parser
 
+_get_parser = lazy(create_parser)
+
 usage_s = """
 usage: pdftocgen [options] doc.pdf < recipe.toml
 """.strip()
@@ -30,8 +32,6 @@ help_s = """
 usage: pdftocgen [options] doc.pdf < recipe.toml
 
 Generate PDF table of contents from a recipe file.
-""".strip()
-
 
 This command automatically generates a table of contents for
 doc.pdf based on the font attributes and position of
@@ -76,13 +76,19 @@ arguments
 options
   -h, --help                show help
   -r, --recipe=recipe.toml  path to the recipe file. if this flag is
-                            not specified, the default is stdin
+                            not specified, the default is stdin. if
+                            nothing is piped or redirected to stdin,
+                            the default recipe is used
   -H, --human-readable      print the toc in a readable format
   -v, --vpos                if this flag is set, the vertical position
                             of each heading will be generated in the
                             output
   -o, --out=file            path to the output file. if this flag is
                             not specified, the default is stdout
+  -j, --jobs=n              number of processes to extract the pages
+                            of doc.pdf with. each one loads the pdf
+                            again, so this only helps for large
+                            documents. the default is 1
   -g, --debug               enable debug mode
   -V, --version             show version number
 
@@ -90,123 +96,89 @@ options
 """.strip()
 
 
+_ERRORS: ErrorTable = {
+    ValueError: ("invalid recipe: ", 1),
+    IOError: ("unable to open file: ", 1),
+    KeyboardInterrupt: ("interrupted: ", 1),
+}
+
 def main():
+    argv = sys.argv[1:]
+
+    # the common no-op invocations are answered before building the parser
+    if argv[:1] in (["-h"], ["--help"]):
+        print(help_s, file=sys.stderr)
+        sys.exit()
+    if argv[:1] in (["-V"], ["--version"]):
+        print("pdftocgen", pdftocgen.__version__, file=sys.stderr)
+        sys.exit()
+
     # parse arguments
+    parser = _get_parser()
+
     try:
-        opts, args = getopt.gnu_getopt(
-            sys.argv[1:],
-            "hr:Hvo:gV",
-            ["help", "recipe=", "human-readable", "vpos", "out=", "debug", "version"]
-        )
-    except GetoptError as e:
-        print(e, file=sys.stderr)
+        opts = parser.parse_args(argv)
+    except SystemExit:
         print(usage_s, file=sys.stderr)
         sys.exit(2)
 
-    recipe_file: TextIO = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-    readable: bool = False
-    vpos: bool = False
+    if opts.help:
+        print(help_s, file=sys.stderr)
+        sys.exit()
+    if opts.version:
+        print("pdftocgen", pdftocgen.__version__, file=sys.stderr)
+        sys.exit()
+
+    readable: bool = opts.human_readable
+    vpos: bool = opts.vpos
     out: TextIO = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
-    debug: bool = False
-
-    for o, a in opts:
-        if o in ("-H", "--human-readable"):
-            readable = True
-        elif o in ("-v", "--vpos"):
-            vpos = True
-        elif o in ("-r", "--recipe"):
-            if opts.recipe:
-              try:
-                  recipe_file = open(opts.recipe, "r", encoding=get_file_encoding(opts.recipe))
-              except IOError as e:
-                  print("error: can't open file for reading", file=sys.stderr)
-                  print(e, file=sys.stderr)
-                  sys.exit(1)
-            else:
-                recipe_file = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-    try:
-        opts, args = parser.parse_args(sys.argv[1:])
-    except SystemExit as e:
-        print(e, file=sys.stderr)
+    jobs: int = opts.jobs
+    debug: bool = opts.debug
+
+    if jobs < 1:
+        print("error: --jobs must be at least 1", file=sys.stderr)
         print(usage_s, file=sys.stderr)
-        sys.exit(2)
+        sys.exit(1)
 
-    recipe_file: TextIO = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-    readable: bool = False
-    vpos: bool = False
-    out: Optional[str] = None
-    debug: bool = False
-
-    for o in opts:
-        if o.long == "--human-readable":
-            readable = True
-        elif o.long == "--vpos":
-            vpos = True
-        elif o.long == "--recipe":
-            try:
-                if opts.recipe:
-                    recipe_file = open(opts.recipe, "r", encoding=get_file_encoding(opts.recipe))
-                else:
-                    recipe_file = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='ignore')
-            except IOError as e:
-                print(f"error: can't open recipe file for reading: {e}", file=sys.stderr)
-                print(e, file=sys.stderr)
-                sys.exit(1)
-        elif o.long == "--out":
-             if opts.out is None:
-                 out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
-             else:
-                try:
-                    out = open(opts.out, "w", encoding='utf-8', errors='ignore')
-                except IOError as e:
-                    print(f"error: can't open out file for writing: {e}", file=sys.stderr)
-                    print(e, file=sys.stderr)
-                    sys.exit(1)
-        elif o.long == "--debug":
-            debug = True
-        elif o.long == "--version":
-            print("pdfgen", pdftocgen.__version__, file=sys.stderr)
-            sys.exit()
-        elif o.long == "--help":
-            print(help_s, file=sys.stderr)
-            sys.exit()
-
-    if len(args) < 1:
+    if opts.out:
+        try:
+            out = open(opts.out, "w", encoding='utf-8', errors='ignore')
+        except IOError as e:
+            print("error: can't open file for writing", file=sys.stderr)
+            print(e, file=sys.stderr)
+            sys.exit(1)
+
+    if opts.pdf_path is None:
         print("error: no input pdf is given", file=sys.stderr)
         print(usage_s, file=sys.stderr)
         sys.exit(1)
 
-    path_in: str = args[0]
+    path_in: str = opts.pdf_path
     # done parsing arguments
-    
+
+    # deferred until here, so --help and --version don't pay for PyMuPDF
+    from fitzutils import open_pdf, dump_toc, pprint_toc
+    from .tocgen import gen_toc
+    from .recipeio import read_recipe, read_recipe_cached
+
     try:
         with open_pdf(path_in) as doc:
-            if recipe_file.name == "<stdin>":
-                try:
-                    recipe = toml.load(open("recipes/default.toml", "r", encoding=get_file_encoding("recipes/default.toml")))
-                except IOError as e:
-                    print("error: unable to open default recipe", file=sys.stderr)
-                    print(e, file=sys.stderr)
-                    sys.exit(1)
+            if opts.recipe:
+                recipe = read_recipe_cached(opts.recipe)
+            elif not sys.stdin.isatty():
+                recipe = read_recipe()
             else:
-              recipe = toml.load(recipe_file)
-            toc = gen_toc(doc, recipe)
+                # no recipe is given, fall back to the default one, which is
+                # precompiled into a python module to skip the toml parsing
+                from ._default_recipe import RECIPE as recipe
+            toc = gen_toc(doc, recipe, jobs)
             if readable:
                 print(pprint_toc(toc), file=out)
             else:
                 print(dump_toc(toc, vpos), end="", file=out)
-    except ValueError as e:
-        if debug:
-            raise e
-        print(f"error: invalid recipe: {e}", file=sys.stderr)
-        sys.exit(1)
-    except IOError as e:
+    except tuple(_ERRORS) as e:
         if debug:
-            raise e
-        print(f"error: unable to open file: {e}", file=sys.stderr)
-        sys.exit(1)
-    except KeyboardInterrupt as e:
-        if debug:
-            raise e
-        print(f"error: interrupted: {e}", file=sys.stderr)
-        sys.exit(1)
+            raise
+        prefix, code = lookup_error(_ERRORS, e)
+        print(f"error: {prefix}{e}", file=sys.stderr)
+        sys.exit(code)
@@ -0,0 +1,37 @@
+"""Helpers shared by the executables of pdftocgen and pdfgen"""
+
+from typing import Any, Callable, Dict, Tuple, Type
+
+# message prefix and exit code of the errors reported by an executable, by
+# exception class
+ErrorTable = Dict[Type[BaseException], Tuple[str, int]]
+
+
+def lookup_error(errors: ErrorTable, e: BaseException) -> Tuple[str, int]:
+    """Find the message prefix and exit code of an error
+
+    The first class in the exception's mro that is in `errors` wins, so
+    subclasses (e.g. FileNotFoundError for IOError) are reported like their
+    base class.
+    """
+    for cls in type(e).__mro__:
+        if cls in errors:
+            return errors[cls]
+    return "", 1
+
+
+def lazy(create: Callable[[], Any]) -> Callable[[], Any]:
+    """Call `create` on first use only and reuse its result afterwards
+
+    Used for the argument parsers, so the invocations answered before
+    parsing (e.g. --help) don't pay for building them.
+    """
+    made = None
+
+    def get():
+        nonlocal made
+        if made is None:
+            made = create()
+        return made
+
+    return get
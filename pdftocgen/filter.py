@@ -20,16 +20,30 @@ def admits_float(expect: Optional[float],
            (actual is not None and abs(expect - actual) <= tolerance)
 
 
+def quantize_size(size: Optional[float]) -> Optional[int]:
+    """Quantize a font size to an integer key
+
+    Two sizes map to the same key if they agree up to DEF_TOLERANCE, which
+    makes sizes usable as (part of) a dictionary key.
+    """
+    return None if size is None else round(size / DEF_TOLERANCE)
+
 
 class ToCFilter:
     """Filter on span dictionary to pick out headings in the ToC"""
+    # slots instead of a __dict__, which makes instances smaller and
+    # attribute access a bit faster
+    __slots__ = ('level', 'greedy', 'font_name', 'font_size', 'size_key')
+
     # The level of the title, strictly > 0
     level: int
     # When set, the filter will be more *greedy* and extract all the text in a
     # block even when at least one match occurs
     greedy: bool
-    font_name: Optional[str] = None
-    font_size: Optional[float] = None
+    font_name: Optional[str]
+    font_size: Optional[float]
+    # font_size quantized by `quantize_size`
+    size_key: Optional[int]
 
     def __init__(self, fltr_dict: dict):
         lvl = fltr_dict.get('level')
@@ -43,6 +57,7 @@ class ToCFilter:
         self.greedy = fltr_dict.get('greedy', False)
         self.font_name = fltr_dict.get('font', {}).get('name')
         self.font_size = fltr_dict.get('font', {}).get('size')
+        self.size_key = quantize_size(self.font_size)
 
     def admits(self, spn: dict) -> bool:
         """Check if the filter admits the span
@@ -54,4 +69,5 @@ class ToCFilter:
         """
         if self.font_name is not None and self.font_name != spn.get('font'):
             return False
-        return self.font_size is None or self.font_size == spn.get('size')
+        return self.size_key is None or \
+            self.size_key == quantize_size(spn.get('size'))
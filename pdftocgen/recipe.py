@@ -1,11 +1,13 @@
 from dataclasses import dataclass
-from typing import Optional, List, Dict, Iterator
-from .filter import ToCFilter
-from fitzutils import ToCEntry
+from typing import Optional, List, Dict, Iterator, Tuple
+from .filter import ToCFilter, quantize_size
+from fitzutils import ToCEntry, get_page_dict, map_page_ranges
 from itertools import chain
 from collections import defaultdict
 from fitz import Document
 
+# number of (font, size) pairs whose matching filter is remembered by a recipe
+MATCH_CACHE_SIZE: int = 4096
 
 class FoundGreedy(Exception):
     """A hacky solution to do short-circuiting in Python.
@@ -65,6 +67,16 @@ def concatFrag(frags: Iterator[Optional[Fragment]], sep: str = " ") -> Dict[int,
 class Recipe:
     """The internal representation of a recipe"""
     filters: List[ToCFilter]
+    # (font name, size key) -> (index, filter), holding the first filter for
+    # each key. unset attributes of a filter are stored as None.
+    _dispatch: Dict[Tuple[Optional[str], Optional[int]], Tuple[int, ToCFilter]]
+    # which of (font name, size key) are set, for each kind of key in
+    # _dispatch
+    _kinds: Tuple[Tuple[bool, bool], ...]
+    # (font name, size) of a span -> the first filter admitting it, or None.
+    # a document only uses a handful of fonts, so most spans are found here
+    # without quantizing their size.
+    _matches: Dict[Tuple[Optional[str], Optional[float]], Optional[ToCFilter]]
 
     def __init__(self, recipe_dict: dict):
         fltr_dicts = recipe_dict.get('heading', [])
@@ -73,6 +85,50 @@ class Recipe:
             raise ValueError("no filters found in recipe")
         self.filters = [ToCFilter(fltr) for fltr in fltr_dicts]
 
+        self._dispatch = {}
+        kinds = []
+        for i, fltr in enumerate(self.filters):
+            key = (fltr.font_name, fltr.size_key)
+            self._dispatch.setdefault(key, (i, fltr))
+            kind = (fltr.font_name is not None, fltr.size_key is not None)
+            if kind not in kinds:
+                kinds.append(kind)
+        self._kinds = tuple(kinds)
+        self._matches = {}
+
+    def _match(self, spn: dict) -> Optional[ToCFilter]:
+        """Find the first filter that admits the span
+
+        Instead of trying each filter in turn, look up the span in the
+        dispatch table once for each kind of filter in the recipe, which is
+        usually just one. The result is remembered in _matches, which
+        `_extract_span` checks first.
+        """
+        font, size = spn.get('font'), spn.get('size')
+        fltr = self._find(font, quantize_size(size))
+        if len(self._matches) >= MATCH_CACHE_SIZE:
+            self._matches.clear()
+        self._matches[(font, size)] = fltr
+        return fltr
+
+    def _find(self,
+              font: Optional[str],
+              size_key: Optional[int]) -> Optional[ToCFilter]:
+        """Look up the first filter for a font name and size key"""
+
+        if self._kinds == ((True, True),):
+            # the common case, all filters set both font name and size
+            hit = self._dispatch.get((font, size_key))
+            return None if hit is None else hit[1]
+
+        best = None
+        for by_font, by_size in self._kinds:
+            hit = self._dispatch.get((font if by_font else None,
+                                      size_key if by_size else None))
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return None if best is None else best[1]
+
     def _extract_span(self, spn: dict) -> Optional[Fragment]:
         """Extract text from span along with level
 
@@ -89,24 +145,25 @@ class Recipe:
         Returns
           a fragment of the heading or None if no match
         """
-        for fltr in self.filters:
-            if fltr.admits(spn):
-                text = spn.get('text', "").strip()
+        key = (spn.get('font'), spn.get('size'))
+        try:
+            fltr = self._matches[key]
+        except KeyError:
+            fltr = self._match(spn)
+        if fltr is None:
+            return None
 
-                if not text:
-                    # don't match empty spaces
-                    return None
+        text = spn.get('text', "").strip()
 
-                if fltr.greedy:
-                    # propagate all the way back to extract_block
-                    raise FoundGreedy(fltr.level)
-                if fltr.font_name is not None and fltr.font_name != spn.get('font'):
-                    return None
-                if fltr.font_size is not None and fltr.font_size != spn.get('size'):
-                    return None
+        if not text:
+            # don't match empty spaces
+            return None
 
-                return Fragment(text, fltr.level)
-        return None
+        if fltr.greedy:
+            # propagate all the way back to extract_block
+            raise FoundGreedy(fltr.level)
+
+        return Fragment(text, fltr.level)
 
     def _extract_line(self, line: dict) -> List[Optional[Fragment]]:
         """Extract matching heading fragments in a line.
@@ -158,21 +215,39 @@ class Recipe:
             return [ToCEntry(e.level, blk_to_str(block), page, vpos)]
 
 
-def extract_toc(doc: Document, recipe: Recipe) -> List[ToCEntry]:
+def _extract_pages(doc: Document,
+                   start: int,
+                   stop: int,
+                   recipe: Recipe) -> List[ToCEntry]:
+    """Extract toc entries from pages [start, stop) of a document"""
+    result = []
+
+    for pno in range(start, stop):
+        for blk in get_page_dict(doc, pno).get('blocks', []):
+            result.extend(
+                recipe.extract_block(blk, pno + 1)
+            )
+
+    return result
+
+
+def extract_toc(doc: Document,
+                recipe: Recipe,
+                jobs: Optional[int] = 1) -> List[ToCEntry]:
     """Extract toc entries from a document
 
+    Text extraction dominates the run time and pages are independent of each
+    other, so large documents can be split into page ranges and processed in
+    parallel by worker processes. This is opt-in, since starting processes
+    from a library call needs the caller's cooperation (e.g. a __main__
+    guard with the spawn start method).
+
     Arguments
       doc: a pdf document
       recipe: recipe from user
+      jobs: number of worker processes, 1 by default. if None is given,
+            use one per cpu, see `fitzutils.map_page_ranges`
     Returns
       a list of toc entries in the document
     """
-    result = []
-
-    for page in doc.pages():
-        for blk in page.get_textpage().extractDICT().get('blocks', []):
-            result.extend(
-                recipe.extract_block(blk, page.number + 1)
-            )
-
-    return result
+    return map_page_ranges(doc, _extract_pages, (recipe,), jobs)
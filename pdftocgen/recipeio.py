@@ -0,0 +1,113 @@
+"""Reading recipe files"""
+
+import os
+import sys
+import mmap
+import stat
+import pickle
+import hashlib
+
+try:
+    import tomllib
+except ImportError:
+    # python < 3.11
+    import tomli as tomllib
+
+from typing import Optional
+
+
+def _read_file(path: str) -> bytes:
+    """Read the content of a file through a memory map
+
+    Falls back to a normal read if the file can't be mapped, e.g. it is
+    empty, or it is a pipe passed as a path.
+    """
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:]
+        except (ValueError, OSError):
+            return f.read()
+
+
+def read_recipe(path: Optional[str] = None) -> dict:
+    """Read a recipe file and parse it into a recipe dictionary
+
+    The whole file is slurped into memory before parsing, which is much
+    cheaper than letting the parser do many small reads through a text
+    wrapper.
+
+    Argument
+      path: path to the recipe file. if None is given, read from stdin
+    Returns
+      the recipe dictionary
+    """
+    if path is None:
+        data = sys.stdin.buffer.read()
+    else:
+        data = _read_file(path)
+    # toml files are always utf-8, so there is no need to guess the encoding.
+    # utf-8-sig also strips the BOM some editors on Windows insert
+    return tomllib.loads(data.decode('utf-8-sig', 'ignore'))
+
+
+def _cache_path(path: str) -> str:
+    """Get the path of the cached recipe for a recipe file
+
+    There is a single cache entry per recipe file, keyed by its absolute
+    path, which is overwritten whenever the file changes.
+    """
+    key = hashlib.blake2b(os.path.abspath(path).encode()).hexdigest()[:16]
+    cache_home = (os.environ.get('XDG_CACHE_HOME') or
+                  os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'pdftocgen', f"{key}.pickle")
+
+
+def read_recipe_cached(path: str) -> dict:
+    """Read a recipe file, reusing the result of previous runs if possible
+
+    The parsed recipe is pickled to ~/.cache/pdftocgen (or $XDG_CACHE_HOME),
+    and loading the pickle is much faster than parsing the toml again when
+    the same recipe is used over and over. The modification time and size of
+    the file are stored along with it, so the cache is invalidated whenever
+    the file changes. Any problem with the cache falls back to `read_recipe`.
+
+    Argument
+      path: path to the recipe file
+    Returns
+      the recipe dictionary
+    """
+    st = os.stat(path)
+    if not stat.S_ISREG(st.st_mode):
+        # e.g. a pipe, which can't be cached
+        return read_recipe(path)
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    cache = _cache_path(path)
+
+    try:
+        with open(cache, "rb") as f:
+            cached_stamp, recipe = pickle.load(f)
+        if cached_stamp == stamp:
+            return recipe
+    except Exception:
+        # missing or broken cache, parse the recipe as usual
+        pass
+
+    recipe = read_recipe(path)
+
+    # write to a temporary file first, so concurrent runs never see a
+    # partially written cache
+    tmp = f"{cache}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump((stamp, recipe), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+    return recipe
@@ -1,15 +1,18 @@
 from fitz import Document
-from typing import List
+from typing import List, Optional
 from fitzutils import ToCEntry
 from .recipe import Recipe, extract_toc
 
-def gen_toc(doc: Document, recipe_dict: dict) -> List[ToCEntry]:
+def gen_toc(doc: Document,
+            recipe_dict: dict,
+            jobs: Optional[int] = 1) -> List[ToCEntry]:
     """Generate the table of content for a document from recipe
 
     Argument
       doc: a pdf document
       recipe_dict: the recipe dictionary used to generate the toc
+      jobs: number of worker processes, see `extract_toc`
     Returns
       a list of ToC entries
     """
-    return extract_toc(doc, Recipe(recipe_dict))
+    return extract_toc(doc, Recipe(recipe_dict), jobs)
@@ -2,4 +2,4 @@
 
 __version__ = '1.3.4'
 
-from .pdfxmeta import extract_meta, dump_meta, dump_toml
+from .pdfxmeta import extract_meta, extract_meta_batch, dump_meta, dump_toml
@@ -58,6 +58,9 @@ options
                      pdftocgen.
   -o, --out=FILE     path to the output file. if this flag is not
                      specified, the default is stdout
+  -j, --jobs=N       number of processes to search the entire document
+                     with. each one loads the pdf again, so this only
+                     helps for large documents. the default is 1
   -V, --version      show version number
 """.strip()
 
@@ -72,8 +75,9 @@ def main():
     try:
         opts, args = getopt.gnu_getopt(
             sys.argv[1:],
-            "hiVp:a:o:",
-            ["help", "ignore-case", "version", "page=", "auto=", "out="]
+            "hiVp:a:o:j:",
+            ["help", "ignore-case", "version", "page=", "auto=", "out=",
+             "jobs="]
         )
     except GetoptError as e:
         print(e, file=sys.stderr)
@@ -83,6 +87,7 @@ def main():
     ignore_case: bool = False
     page: Optional[int] = None
     auto_level: Optional[int] = None
+    jobs: int = 1
     out: TextIO = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
 
     for o, a in opts:
@@ -100,6 +105,15 @@ def main():
             except ValueError as e:
                 print("error: invalid level", file=sys.stderr)
                 sys.exit(1)
+        elif o in ("-j", "--jobs"):
+            try:
+                jobs = int(a)
+            except ValueError as e:
+                print("error: invalid number of jobs", file=sys.stderr)
+                sys.exit(1)
+            if jobs < 1:
+                print("error: --jobs must be at least 1", file=sys.stderr)
+                sys.exit(1)
         elif o in ("-o", "--out"):
             try:
                 out = open(a, "w", encoding='utf-8', errors='ignore')
@@ -130,7 +144,7 @@ def main():
     # done parsing arguments
 
     with open_pdf(path_in) as doc:
-        meta = extract_meta(doc, pattern, page, ignore_case)
+        meta = extract_meta(doc, pattern, page, ignore_case, jobs)
 
         # nothing found
         if len(meta) == 0:
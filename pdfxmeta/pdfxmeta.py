@@ -3,15 +3,41 @@
 from toml.encoder import _dump_str, _dump_float
 
 import re
+import fitz
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from fitz import Document, Page
-from typing import Optional, List
+from fitzutils import (
+    extract_page_dict,
+    get_page_dict,
+    map_page_ranges,
+    pick_jobs
+)
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, TextIO, Tuple, Union
+
+__all__ = [
+    'extract_meta',
+    'extract_meta_batch',
+    'search_in_page',
+    'get_spans',
+    'generate_recipe',
+    'generate_recipe_from_spans',
+    'write_recipe',
+    'dump_meta',
+    'dump_toml',
+]
+
+# the bound `search` method of a compiled pattern
+SearchFn = Callable[[str], Optional[re.Match]]
 
 
 def extract_meta(doc: Document,
                  pattern: str,
                  page: Optional[int] = None,
-                 ign_case: bool = False
+                 ign_case: bool = False,
+                 jobs: Optional[int] = 1
                  ) -> List[dict]:
     """Extract meta for a `pattern` on `page` in a pdf document
 
@@ -21,54 +47,141 @@ def extract_meta(doc: Document,
       page: page number (1-based index), if None is given, search for the
             entire document, but this is highly discouraged.
       ign_case: ignore case?
+      jobs: number of worker processes used to search the entire document,
+            see `fitzutils.map_page_ranges`
     """
-    result = []
+    result: List[dict] = []
 
-    if page is None:
-        pages = doc.pages()
-    elif 1 <= page <= doc.page_count:
-        pages = [doc[page - 1]]
-    else:  # page out of range
+    if page is not None and not 1 <= page <= doc.page_count:
+        # page out of range
         return result
 
-    regex = re.compile(
-        pattern,
-        re.IGNORECASE
-    ) if ign_case else re.compile(pattern)
+    search = _compile(pattern, ign_case).search
 
-    # we could parallelize this, but I don't see a reason
-    # to *not* specify a page number
-    for p in pages:
-        result.extend(search_in_page(regex, p))
+    if page is not None:
+        return _search_pages(doc, page - 1, page, search)
 
-    return result
+    return map_page_ranges(doc, _search_pages, (search,), jobs)
+
+
+def extract_meta_batch(paths: List[str],
+                       pattern: str,
+                       page: Optional[int] = None,
+                       ign_case: bool = False,
+                       jobs: Optional[int] = 1
+                       ) -> Dict[str, List[dict]]:
+    """Extract meta for a `pattern` in many pdf files
+
+    The files can be spread over a pool of worker processes, each of which
+    compiles the pattern and loads PyMuPDF only once, however many files it
+    processes. This is opt-in, like in `extract_meta`.
+
+    Arguments
+      paths: paths of the pdf files
+      pattern: a regular expression pattern
+      page: page number (1-based index), see `extract_meta`
+      ign_case: ignore case?
+      jobs: number of worker processes, 1 by default. if None is given, use
+            one per cpu, see `fitzutils.pick_jobs`
+    Returns
+      the meta of each file, by path
+    """
+    jobs = pick_jobs(jobs, len(paths))
+
+    if jobs <= 1:
+        return {path: _extract_meta_path(path, pattern, page, ign_case)
+                for path in paths}
 
+    executor = ProcessPoolExecutor(max_workers=jobs,
+                                   initializer=_init_batch_worker,
+                                   initargs=(pattern, page, ign_case))
+    with executor:
+        results = executor.map(_extract_meta_file, paths,
+                               chunksize=max(1, len(paths) // (4 * jobs)))
+        return dict(zip(paths, results))
 
-def search_in_page(regex: re.Pattern, page: Page) -> List[dict]:
-    """Search for `text` in `page` and extract meta
+
+# the search of a batch worker process, set once by `_init_batch_worker`
+_batch_search: Optional[Tuple[str, Optional[int], bool]] = None
+
+
+def _init_batch_worker(pattern: str, page: Optional[int], ign_case: bool):
+    """Compile the pattern and keep the search of a batch worker"""
+    global _batch_search
+    _compile(pattern, ign_case)
+    _batch_search = (pattern, page, ign_case)
+
+
+def _extract_meta_file(path: str) -> List[dict]:
+    """Extract meta from a single file in a batch worker"""
+    if _batch_search is None:
+        raise RuntimeError("batch worker is not initialized")
+    return _extract_meta_path(path, *_batch_search)
+
+
+def _extract_meta_path(path: str,
+                       pattern: str,
+                       page: Optional[int],
+                       ign_case: bool) -> List[dict]:
+    """Extract meta from a single file in a batch"""
+    doc = fitz.open(path)
+    try:
+        # the files are already spread over the workers, so don't start
+        # another pool for the pages of each one
+        return extract_meta(doc, pattern, page, ign_case, jobs=1)
+    finally:
+        doc.close()
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str, ign_case: bool) -> re.Pattern:
+    """Compile a search pattern, reusing the result for repeated calls"""
+    return re.compile(pattern, re.IGNORECASE if ign_case else 0)
+
+
+def search_in_page(search: Union[re.Pattern, SearchFn],
+                   page: Page) -> List[dict]:
+    """Search for a pattern in `page` and extract meta
 
     Arguments
-      needle: the text to search for
-      page: page number (1-based index)
+      search: a compiled pattern, or its bound `search` method
+      page: a page of the document
     Returns
       a list of meta
     """
-    result = []
+    # the current search algorithm is very naive and doesn't handle line
+    # breaks and more complex layout. might want to take a look at
+    # `page.searchFor`, but the current algorithm should be enough for
+    # TeX-generated pdf
+    _search = search.search if isinstance(search, re.Pattern) else search
+    return _search_spans(_search, iter_spans(page))
+
+
+def _search_spans(search: SearchFn, spans: Iterable[dict]) -> List[dict]:
+    """Keep the spans whose text matches"""
+    # don't run the regex on empty spans, unless the pattern itself matches
+    # an empty string (e.g. "^$")
+    skip_empty = search("") is None
+    return [
+        spn for spn in spans
+        if (spn.get('text') or not skip_empty) and search(spn.get('text', ""))
+    ]
+
+
+def iter_spans(page: Page) -> Iterator[dict]:
+    """Iterate over all the spans in `page`, in reading order"""
+    return _iter_dict_spans(extract_page_dict(page))
+
+
+def _iter_dict_spans(page_meta: dict) -> Iterator[dict]:
+    """Iterate over all the spans in a page dict, in reading order"""
+    # image blocks have no lines, so get(key, []) is still needed for them
+    return chain.from_iterable(
+        ln['spans']
+        for blk in page_meta.get('blocks', [])
+        for ln in blk.get('lines', [])
+    )
 
-    page_meta = page.get_textpage().extractDICT()
-
-    # we are using get(key, []) to bypass any missing key errors
-    for blk in page_meta.get('blocks', []):
-        for ln in blk.get('lines', []):
-            for spn in ln.get('spans', []):
-                text = spn.get('text', "")
-                # the current search algorithm is very naive and doesn't handle
-                # line breaks and more complex layout. might want to take a
-                # look at `page.searchFor`, but the current algorithm should be
-                # enough for TeX-generated pdf
-                if regex.search(text):
-                    result.append(spn)
-    return result
 
 def blk_to_str(blk: dict) -> str:
     """Extract all the text inside a block"""
@@ -79,281 +192,198 @@ def blk_to_str(blk: dict) -> str:
     ])
 
 
-def to_bools(var: int) -> str:
-    """Convert int to lowercase bool string"""
-    return str(var != 0).lower()
+_BOOLSTR = ('false', 'true')
 
 
-def dump_meta(spn: dict) -> str:
-    """Dump the span dict from PyMuPDF to TOML compatible string"""
-    result = []
+def to_bools(var: int) -> str:
+    """Convert int to lowercase bool string"""
+    return _BOOLSTR[var != 0]
 
-    result.append(f"font.name = {_dump_str(spn['font'])}")
-    result.append(f"font.size = {_dump_float(spn['size'])}")
-    result.append(f"font.color = {spn['color']:#08x}")
 
-    flags = spn['flags']
+# the bool strings of every combination of the five font flags, indexed by
+# the flags
+_FLAG_BOOLS: List[Tuple[str, str, str, str, str]] = [
+    (
+        to_bools(flags & 0b00001),
+        to_bools(flags & 0b00010),
+        to_bools(flags & 0b00100),
+        to_bools(flags & 0b01000),
+        to_bools(flags & 0b10000),
+    )
+    for flags in range(0b100000)
+]
 
-    result.append(f"font.superscript = {to_bools(flags & 0b00001)}")
-    result.append(f"font.italic = {to_bools(flags & 0b00010)}")
-    result.append(f"font.serif = {to_bools(flags & 0b00100)}")
-    result.append(f"font.monospace = {to_bools(flags & 0b01000)}")
-    result.append(f"font.bold = {to_bools(flags & 0b10000)}")
 
-    bbox = spn['bbox']
+def flag_bools(flags: int) -> Tuple[str, str, str, str, str]:
+    """Convert the font flags of a span to lowercase bool strings
 
-    result.append(f"bbox.left = {_dump_float(bbox[0])}")
-    result.append(f"bbox.top = {_dump_float(bbox[1])}")
-    result.append(f"bbox.right = {_dump_float(bbox[2])}")
-    result.append(f"bbox.bottom = {_dump_float(bbox[3])}")
+    Returns
+      (superscript, italic, serif, monospace, bold)
+    """
+    return _FLAG_BOOLS[flags & 0b11111]
 
-    return '\n'.join(result)
 
-def generate_recipe(doc: Document, recipe_file: str, page: Optional[int] = None, ign_case: bool = False) -> List[dict]:
-    """Generate a recipe based on the pdf document."""
-    
-    def get_spans(doc: Document, page: Optional[int] = None) -> List[dict]:
-      """Extract all spans in the document"""
-      all_spans = []
-      if page is None:
-        pages = doc.pages()
-      elif 1 <= page <= doc.page_count:
-          pages = [doc[page - 1]]
-      else:  # page out of range
-          return result
-      for p in pages:
-        page_meta = p.get_textpage().extractDICT()
-        for blk in page_meta.get('blocks', []):
-            for ln in blk.get('lines', []):
-              all_spans.extend(ln.get('spans', []))
-      return all_spans
-    spans = get_spans(doc, page)
-    
-    if not spans:
-      return []
-
-    spans_by_size = {}
-    for sp in spans:
-        font_size = sp['size']
-        spans_by_size.setdefault(font_size, []).append(sp)
-    
-    spans_by_size_sorted = sorted(spans_by_size.items(), key=lambda item: item[0])
-
-    recipe = []
-    if len(spans_by_size_sorted) >= 1:
-      for i in range(len(spans_by_size_sorted)):
-        sp = spans_by_size_sorted[i]
-        result.append("[[heading]]")
-        result.append(f"level = {i+1}")
-        result.append(f"font.name = {_dump_str(sp['font'])}")
-        result.append(f"font.size = {_dump_float(sp['size'])}")
+@lru_cache(maxsize=1024)
+def _hex8(color: int) -> str:
+    """Format a color as 0xrrggbb, documents only use a few of them"""
+    return f"{color:#08x}"
 
-    return result
-    
 
-    
-    
+@lru_cache(maxsize=1024, typed=True)
+def _dump_size(size: float) -> str:
+    """Dump a font size to toml, documents only use a few of them"""
+    return _dump_float(size)
 
 
-def extract_meta(doc: Document,
-                 pattern: str,
-                 page: Optional[int] = None,
-                 ign_case: bool = False
-                 ) -> List[dict]:
-    """Extract meta for a `pattern` on `page` in a pdf document
+def dump_meta(spn: dict) -> str:
+    """Dump the span dict from PyMuPDF to TOML compatible string"""
+    font, size, color = spn['font'], spn['size'], spn['color']
+    sup, ital, serif, mono, bold = flag_bools(spn['flags'])
+    left, top, right, bottom = spn['bbox']
+
+    return (
+        f"font.name = {_dump_str(font)}\n"
+        f"font.size = {_dump_size(size)}\n"
+        f"font.color = {_hex8(color)}\n"
+        f"font.superscript = {sup}\n"
+        f"font.italic = {ital}\n"
+        f"font.serif = {serif}\n"
+        f"font.monospace = {mono}\n"
+        f"font.bold = {bold}\n"
+        f"bbox.left = {_dump_float(left)}\n"
+        f"bbox.top = {_dump_float(top)}\n"
+        f"bbox.right = {_dump_float(right)}\n"
+        f"bbox.bottom = {_dump_float(bottom)}"
+    )
+
+
+def get_spans(doc: Document,
+              page: Optional[int] = None,
+              jobs: Optional[int] = 1) -> List[dict]:
+    """Extract all spans in the document
 
     Arguments
       doc: document from pymupdf
-      pattern: a regular expression pattern
-      page: page number (1-based index), if None is given, search for the
-            entire document, but this is highly discouraged.
-      ign_case: ignore case?
+      page: page number (1-based index), if None is given, extract the
+            spans of the entire document
+      jobs: number of worker processes used for the entire document, see
+            `fitzutils.map_page_ranges`
     """
-    result = []
-
     if page is None:
-        pages = doc.pages()
-    elif 1 <= page <= doc.page_count:
-        pages = [doc[page - 1]]
-    else:  # page out of range
-        return result
-
-    regex = re.compile(
-        pattern,
-        re.IGNORECASE
-    ) if ign_case else re.compile(pattern)
+        return map_page_ranges(doc, _spans_of_pages, (), jobs)
+    if 1 <= page <= doc.page_count:
+        return _spans_of_pages(doc, page - 1, page)
+    # page out of range
+    return []
+
+
+def _spans_of_pages(doc: Document, start: int, stop: int) -> List[dict]:
+    """Extract all spans from pages [start, stop) of a document"""
+    return list(chain.from_iterable(
+        _iter_dict_spans(get_page_dict(doc, pno))
+        for pno in range(start, stop)
+    ))
+
+
+def _search_pages(doc: Document,
+                  start: int,
+                  stop: int,
+                  search: SearchFn) -> List[dict]:
+    """Search for a pattern in pages [start, stop) of a document"""
+    result = []
+    for pno in range(start, stop):
+        result.extend(_search_spans(
+            search, _iter_dict_spans(get_page_dict(doc, pno))
+        ))
+    return result
 
-    # we could parallelize this, but I don't see a reason
-    # to *not* specify a page number
-    for p in pages:
-        result.extend(search_in_page(regex, p))
 
-    return result
-    
-    
-def generate_recipe(doc: Document, recipe_file: str, page: Optional[int] = None, ign_case: bool = False) -> List[dict]:
+def generate_recipe(doc: Document,
+                    recipe_file: str,
+                    page: Optional[int] = None,
+                    ign_case: bool = False,
+                    jobs: Optional[int] = 1) -> List[str]:
     """Generate a recipe based on the pdf document."""
-    #TODO : Add logic to generate a recipe
-    
-    
-    spans = get_spans(doc,page)
-    return generate_recipe_from_spans(spans)
-
-def generate_recipe_from_spans(spans: List[dict]) -> List[dict]:
-  """Generate recipe from spans, it creates a basic recipe based on the different spans present in the document."""
-  result = []
-  spans_by_size = {}
-  for sp in spans:
-    font_size = sp['size']
-    spans_by_size.setdefault(font_size, []).append(sp)
-
-  spans_by_size_sorted = sorted(spans_by_size.items(), key=lambda item: item[0])
-
-  recipe = []
-  if len(spans_by_size_sorted) >= 1:
-    for i in range(len(spans_by_size_sorted)):
-      sp = spans_by_size_sorted[i]
-      result.append("[[heading]]")
-      result.append(f"level = {i+1}")
-      result.append(f"font.name = {_dump_str(sp['font'])}")
-      result.append(f"font.size = {_dump_float(sp['size'])}")
-      result.append("# font.size_tolerance = 1e-5")
-      result.append(f"# font.color = {sp['color']:#08x}")
-
-      flags = sp['flags']
-
-      result.append(f"# font.superscript = {to_bools(flags & 0b00001)}")
-      result.append(f"# font.italic = {to_bools(flags & 0b00010)}")
-      result.append(f"# font.serif = {to_bools(flags & 0b00100)}")
-      result.append(f"# font.monospace = {to_bools(flags & 0b01000)}")
-      result.append(f"# font.bold = {to_bools(flags & 0b10000)}")
-
-      bbox = sp['bbox']
-
-      result.append(f"# bbox.left = {_dump_float(bbox[0])}")
-      result.append(f"# bbox.top = {_dump_float(bbox[1])}")
-      result.append(f"# bbox.right = {_dump_float(bbox[2])}")
-      result.append(f"# bbox.bottom = {_dump_float(bbox[3])}")
-      result.append("# bbox.tolerance = 1e-5")
-
-      
-  return result
-
-def get_spans(doc: Document, page: Optional[int] = None) -> List[dict]:
-    """Extract all spans in the document"""
-    all_spans = []
     if page is None:
-        pages = doc.pages()
-    elif 1 <= page <= doc.page_count:
-        pages = [doc[page - 1]]
-    else:  # page out of range
-        return result
-    for p in pages:
-      page_meta = p.get_textpage().extractDICT()
-      for blk in page_meta.get('blocks', []):
-          for ln in blk.get('lines', []):
-            all_spans.extend(ln.get('spans', []))
-    return all_spans
-
-
-def extract_meta(doc: Document,
-                 pattern: str,
-                 page: Optional[int] = None,
-                 ign_case: bool = False
-                 ) -> List[dict]:
-    """Extract meta for a `pattern` on `page` in a pdf document
-
-    Arguments
-      doc: document from pymupdf
-      pattern: a regular expression pattern
-      page: page number (1-based index), if None is given, search for the
-            entire document, but this is highly discouraged.
-      ign_case: ignore case?
-    """
-    result = []
+        # only one span per size is needed, so the pages are reduced to those
+        # as they are read, and the spans of the document are never all kept
+        # in memory or sent between processes
+        spans = map_page_ranges(doc, _first_spans_of_pages, (), jobs)
+    else:
+        spans = get_spans(doc, page)
+    return generate_recipe_from_spans(spans)
 
-    if page is None:
-        pages = doc.pages()
-    elif 1 <= page <= doc.page_count:
-        pages = [doc[page - 1]]
-    else:  # page out of range
-        return result
 
-    regex = re.compile(
-        pattern,
-        re.IGNORECASE
-    ) if ign_case else re.compile(pattern)
+def _first_span_by_size(spans: Iterable[dict]) -> Dict[float, dict]:
+    """Map each font size to the first span of that size"""
+    first_span_by_size: Dict[float, dict] = {}
+    for sp in spans:
+        first_span_by_size.setdefault(sp['size'], sp)
+    return first_span_by_size
+
+
+def _first_spans_of_pages(doc: Document, start: int, stop: int) -> List[dict]:
+    """The first span of each size in pages [start, stop) of a document"""
+    spans = chain.from_iterable(
+        _iter_dict_spans(get_page_dict(doc, pno))
+        for pno in range(start, stop)
+    )
+    return list(_first_span_by_size(spans).values())
+
+
+def generate_recipe_from_spans(spans: Iterable[dict]) -> List[str]:
+    """Generate recipe from spans, it creates a basic recipe based on the different spans present in the document."""
+    return list(_iter_recipe_lines(spans))
+
+
+def write_recipe(spans: Iterable[dict], file: TextIO):
+    """Write the recipe generated from spans to a file, line by line"""
+    file.writelines(line + "\n" for line in _iter_recipe_lines(spans))
+
+
+def _iter_recipe_lines(spans: Iterable[dict]) -> Iterator[str]:
+    """Yield the lines of the recipe generated from spans"""
+    # the first span of each size stands for all the others, so there is no
+    # need to keep the rest of them around
+    first_span_by_size = _first_span_by_size(spans)
+
+    for i, size in enumerate(sorted(first_span_by_size)):
+        sp = first_span_by_size[size]
+        font, color = sp['font'], sp['color']
+        sup, ital, serif, mono, bold = flag_bools(sp['flags'])
+        left, top, right, bottom = sp['bbox']
+
+        yield "[[heading]]"
+        yield f"level = {i+1}"
+        yield f"font.name = {_dump_str(font)}"
+        yield f"font.size = {_dump_size(size)}"
+        yield "# font.size_tolerance = 1e-5"
+        yield f"# font.color = {_hex8(color)}"
+        yield f"# font.superscript = {sup}"
+        yield f"# font.italic = {ital}"
+        yield f"# font.serif = {serif}"
+        yield f"# font.monospace = {mono}"
+        yield f"# font.bold = {bold}"
+        yield f"# bbox.left = {_dump_float(left)}"
+        yield f"# bbox.top = {_dump_float(top)}"
+        yield f"# bbox.right = {_dump_float(right)}"
+        yield f"# bbox.bottom = {_dump_float(bottom)}"
+        yield "# bbox.tolerance = 1e-5"
+
+
+@lru_cache(maxsize=128)
+def _strip_subset(font: str) -> str:
+    """Strip the subset prefix (ABCDEF+) from a font name"""
+    # == takeWhile (\c -> c /= '+') str
+    before, sep, after = font.partition('+')
+    return after if sep else before
 
-    # we could parallelize this, but I don't see a reason
-    # to *not* specify a page number
-    for p in pages:
-        result.extend(search_in_page(regex, p))
 
-    return result
-    
-    
-def generate_recipe(doc: Document, recipe_file: str, page: Optional[int] = None, ign_case: bool = False) -> List[dict]:
-    """Generate a recipe based on the pdf document."""
-    
-    
-    spans = get_spans(doc,page)
-    return generate_recipe_from_spans(spans)
+@lru_cache(maxsize=128)
+def _quoted_font(font: str) -> str:
+    """The toml string of a font name without its subset prefix"""
+    return _dump_str(_strip_subset(font))
 
-def generate_recipe_from_spans(spans: List[dict]) -> List[dict]:
-  """Generate recipe from spans, it creates a basic recipe based on the different spans present in the document."""
-  result = []
-  spans_by_size = {}
-  for sp in spans:
-    font_size = sp['size']
-    spans_by_size.setdefault(font_size, []).append(sp)
-
-  spans_by_size_sorted = sorted(spans_by_size.items(), key=lambda item: item[0])
-
-  recipe = []
-  if len(spans_by_size_sorted) >= 1:
-    for i in range(len(spans_by_size_sorted)):
-      sp = spans_by_size_sorted[i]
-      result.append("[[heading]]")
-      result.append(f"level = {i+1}")
-      result.append(f"font.name = {_dump_str(sp['font'])}")
-      result.append(f"font.size = {_dump_float(sp['size'])}")
-      result.append("# font.size_tolerance = 1e-5")
-      result.append(f"# font.color = {sp['color']:#08x}")
-
-      flags = sp['flags']
-
-      result.append(f"# font.superscript = {to_bools(flags & 0b00001)}")
-      result.append(f"# font.italic = {to_bools(flags & 0b00010)}")
-      result.append(f"# font.serif = {to_bools(flags & 0b00100)}")
-      result.append(f"# font.monospace = {to_bools(flags & 0b01000)}")
-      result.append(f"# font.bold = {to_bools(flags & 0b10000)}")
-
-      bbox = sp['bbox']
-
-      result.append(f"# bbox.left = {_dump_float(bbox[0])}")
-      result.append(f"# bbox.top = {_dump_float(bbox[1])}")
-      result.append(f"# bbox.right = {_dump_float(bbox[2])}")
-      result.append(f"# bbox.bottom = {_dump_float(bbox[3])}")
-      result.append("# bbox.tolerance = 1e-5")
-
-      
-  return result
-    
-def get_spans(doc: Document, page: Optional[int] = None) -> List[dict]:
-    """Extract all spans in the document"""
-    all_spans = []
-    if page is None:
-        pages = doc.pages()
-    elif 1 <= page <= doc.page_count:
-        pages = [doc[page - 1]]
-    else:  # page out of range
-        return result
-    for p in pages:
-      page_meta = p.get_textpage().extractDICT()
-      for blk in page_meta.get('blocks', []):
-          for ln in blk.get('lines', []):
-            all_spans.extend(ln.get('spans', []))
-    return all_spans
 
 def dump_toml(spn: dict, level: int, trail_nl: bool = False) -> str:
     """Dump a valid TOML directly usable by pdftocgen
@@ -365,40 +395,30 @@ def dump_toml(spn: dict, level: int, trail_nl: bool = False) -> str:
     Returns
       a valid toml string
     """
-    result = []
-
-    result.append("[[heading]]")
-    result.append(f"# {spn.get('text', '')}")
-    result.append(f"level = {level}")
-    result.append("greedy = true")
-
-    # strip font subset prefix
-    # == takeWhile (\c -> c /= '+') str
-    before, sep, after = spn['font'].partition('+')
-    font = after if sep else before
-
-    result.append(f"font.name = {_dump_str(font)}")
-    result.append(f"font.size = {_dump_float(spn['size'])}")
-    result.append("# font.size_tolerance = 1e-5")
-    result.append(f"# font.color = {spn['color']:#08x}")
-
-    flags = spn['flags']
-
-    result.append(f"# font.superscript = {to_bools(flags & 0b00001)}")
-    result.append(f"# font.italic = {to_bools(flags & 0b00010)}")
-    result.append(f"# font.serif = {to_bools(flags & 0b00100)}")
-    result.append(f"# font.monospace = {to_bools(flags & 0b01000)}")
-    result.append(f"# font.bold = {to_bools(flags & 0b10000)}")
-
-    bbox = spn['bbox']
-
-    result.append(f"# bbox.left = {_dump_float(bbox[0])}")
-    result.append(f"# bbox.top = {_dump_float(bbox[1])}")
-    result.append(f"# bbox.right = {_dump_float(bbox[2])}")
-    result.append(f"# bbox.bottom = {_dump_float(bbox[3])}")
-    result.append("# bbox.tolerance = 1e-5")
-
-    if trail_nl:
-        result.append("")
-
-    return '\n'.join(result)
+    text, size, color = spn.get('text', ''), spn['size'], spn['color']
+    sup, ital, serif, mono, bold = flag_bools(spn['flags'])
+    left, top, right, bottom = spn['bbox']
+
+    font = _quoted_font(spn['font'])
+    end = "\n" if trail_nl else ""
+
+    return (
+        "[[heading]]\n"
+        f"# {text}\n"
+        f"level = {level}\n"
+        "greedy = true\n"
+        f"font.name = {font}\n"
+        f"font.size = {_dump_size(size)}\n"
+        "# font.size_tolerance = 1e-5\n"
+        f"# font.color = {_hex8(color)}\n"
+        f"# font.superscript = {sup}\n"
+        f"# font.italic = {ital}\n"
+        f"# font.serif = {serif}\n"
+        f"# font.monospace = {mono}\n"
+        f"# font.bold = {bold}\n"
+        f"# bbox.left = {_dump_float(left)}\n"
+        f"# bbox.top = {_dump_float(top)}\n"
+        f"# bbox.right = {_dump_float(right)}\n"
+        f"# bbox.bottom = {_dump_float(bottom)}\n"
+        f"# bbox.tolerance = 1e-5{end}"
+    )
@@ -0,0 +1,23 @@
+from mamba import description, it
+from pdftocgen.cliutils import lazy, lookup_error
+
+with description("lookup_error") as self:
+    with it("finds the entry of the error's class"):
+        errors = {ValueError: ("invalid recipe: ", 1), IOError: ("", 2)}
+        assert lookup_error(errors, ValueError("x")) == ("invalid recipe: ", 1)
+
+    with it("falls back to the entry of a base class"):
+        errors = {ValueError: ("", 1), IOError: ("unable to open file: ", 2)}
+        assert lookup_error(errors, FileNotFoundError("x")) == \
+            ("unable to open file: ", 2)
+
+    with it("returns a default if nothing matches"):
+        assert lookup_error({ValueError: ("", 2)}, KeyError("x")) == ("", 1)
+
+with description("lazy") as self:
+    with it("only calls the function on first use"):
+        calls = []
+        get = lazy(lambda: calls.append(1) or object())
+        assert calls == []
+        assert get() is get()
+        assert calls == [1]
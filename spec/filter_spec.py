@@ -1,9 +1,11 @@
 import os
+import pickle
 
 from mamba import description, it, before
 from pdftocgen.filter import (
     ToCFilter,
-    admits_float
+    admits_float,
+    quantize_size
 )
 
 dirpath = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +26,42 @@ with description("admits_float") as self:
     with it("does not admit if expect is set but actual is None"):
         assert not admits_float(1, None, 0.1)
 
+with description("quantize_size") as self:
+    with it("maps equal sizes to the same key"):
+        assert quantize_size(9.962599754333496) == quantize_size(9.962599754333496)
+        assert quantize_size(9.962599754333496) != quantize_size(9.96)
+
+    with it("returns None if size is unset"):
+        assert quantize_size(None) is None
+
+with description("ToCFilter.admits") as self:
+    with it("admits anything if no font is set"):
+        admits = ToCFilter({'level': 1}).admits
+        assert admits({'font': "CMBX12", 'size': 1})
+        assert admits({})
+
+    with it("only checks the attributes that are set"):
+        def admits(font, spn):
+            return ToCFilter({'level': 1, 'font': font}).admits(spn)
+
+        assert admits({'name': "CMBX12"}, {'font': "CMBX12", 'size': 1})
+        assert not admits({'name': "CMBX12"}, {'font': "CMR10"})
+        assert admits({'size': 1}, {'font': "CMR10", 'size': 1})
+        assert not admits({'size': 1}, {'font': "CMR10", 'size': 2})
+        assert admits({'name': "CMBX12", 'size': 1},
+                      {'font': "CMBX12", 'size': 1})
+        assert not admits({'name': "CMBX12", 'size': 1},
+                          {'font': "CMBX12", 'size': 2})
+        assert not admits({'name': "CMBX12", 'size': 1},
+                          {'font': "CMR10", 'size': 1})
+
+    with it("can be pickled"):
+        fltr = ToCFilter({'level': 2, 'font': {'name': "CMBX12", 'size': 1}})
+        copy = pickle.loads(pickle.dumps(fltr))
+        assert copy.level == 2
+        assert copy.admits({'font': "CMBX12", 'size': 1})
+        assert not copy.admits({'font': "CMBX12", 'size': 2})
+
 with description("ToCFilter") as self:
     with before.all:
         self.title_exact = {
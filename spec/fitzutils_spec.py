@@ -5,7 +5,10 @@ from mamba import description, it, before
 from fitzutils import (
     open_pdf,
     ToCEntry,
-    dump_toc
+    dump_toc,
+    get_page_dict,
+    can_reopen,
+    pick_jobs
 )
 from pdftocio.tocparser import parse_toc
 
@@ -33,6 +36,40 @@ with description("open_pdf:") as self:
         except:
             pass
 
+with description("get_page_dict:") as self:
+    with it("extracts the same dict as extractDICT"):
+        with open_pdf(valid_file, False) as doc:
+            assert get_page_dict(doc, 0) == doc[0].get_textpage().extractDICT()
+
+    with it("reuses the dict of a page it has already seen"):
+        with open_pdf(valid_file, False) as doc:
+            assert get_page_dict(doc, 1) is get_page_dict(doc, 1)
+            assert get_page_dict(doc, 1) is not get_page_dict(doc, 2)
+
+with description("can_reopen:") as self:
+    with it("allows unmodified files on disk"):
+        with open_pdf(valid_file, False) as doc:
+            assert can_reopen(doc)
+
+    with it("rejects encrypted files, even after they are unlocked"):
+        path = os.path.join(dirpath, "files/level2_encrypted.pdf")
+        with open_pdf(path, False) as doc:
+            assert not can_reopen(doc)
+            assert doc.authenticate("u")
+            assert not can_reopen(doc)
+
+with description("pick_jobs:") as self:
+    with it("uses the number of jobs asked for"):
+        assert pick_jobs(1, 10) == 1
+        assert pick_jobs(3, 10) == 3
+
+    with it("never uses more jobs than pieces of work"):
+        assert pick_jobs(8, 2) == 2
+        assert pick_jobs(None, 1) == 1
+
+    with it("uses one job per cpu if None is given"):
+        assert 1 <= pick_jobs(None, 100) <= (os.cpu_count() or 1)
+
 with description("ToCEntry") as self:
     with it("matches fitz's representation"):
         fitz_entry = [1, "title", 2]
@@ -0,0 +1,57 @@
+from mamba import description, it, before
+from pdftocgen.recipe import Recipe
+
+with description("Recipe") as self:
+    with before.all:
+        self.spn = {
+            'size': 14.346199989318848,
+            'flags': 20,
+            'font': 'CMBX12',
+            'color': 0,
+            'text': 'Section Two',
+            'bbox': (157.98439025878906,
+                     567.3842163085938,
+                     245.18057250976562,
+                     581.7447509765625)
+        }
+
+    with it("raises error if no filter is given"):
+        try:
+            Recipe({})
+        except ValueError:
+            pass
+        else:
+            assert False, "must raise error"
+
+    with it("matches the first filter that admits the span"):
+        recipe = Recipe({'heading': [
+            {'level': 1, 'font': {'name': "CMR10", 'size': 14.346199989318848}},
+            {'level': 2, 'font': {'size': 14.346199989318848}},
+            {'level': 3, 'font': {'name': "CMBX12", 'size': 14.346199989318848}},
+            {'level': 4}
+        ]})
+        assert recipe._match(self.spn).level == 2
+
+    with it("matches filters without any font attributes"):
+        recipe = Recipe({'heading': [
+            {'level': 1, 'font': {'name': "CMR10"}},
+            {'level': 2}
+        ]})
+        assert recipe._match(self.spn).level == 2
+
+    with it("returns None if no filter admits the span"):
+        recipe = Recipe({'heading': [
+            {'level': 1, 'font': {'name': "CMR10", 'size': 14.346199989318848}},
+            {'level': 2, 'font': {'name': "CMBX12", 'size': 10}}
+        ]})
+        assert recipe._match(self.spn) is None
+
+    with it("remembers the filter of each font and size"):
+        recipe = Recipe({'heading': [
+            {'level': 1, 'font': {'name': "CMBX12", 'size': 14.346199989318848}}
+        ]})
+        fltr = recipe._match(self.spn)
+        assert recipe._matches[('CMBX12', 14.346199989318848)] is fltr
+        assert recipe._extract_span(self.spn).level == 1
+        assert recipe._extract_span({**self.spn, 'font': "CMR10"}) is None
+        assert recipe._matches[('CMR10', 14.346199989318848)] is None
@@ -0,0 +1,76 @@
+import os
+import toml
+import tempfile
+
+from mamba import description, it, before, after
+from pdftocgen.recipeio import read_recipe, read_recipe_cached, _cache_path
+
+dirpath = os.path.dirname(os.path.abspath(__file__))
+
+with description("read_recipe") as self:
+    with before.all:
+        self.path = os.path.join(dirpath, "files/level2_recipe.toml")
+
+    with it("reads recipe files correctly"):
+        assert read_recipe(self.path) == toml.load(open(self.path))
+
+    with it("reads recipe files with a byte order mark"):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bom_path = os.path.join(tmpdir, "bom.toml")
+            with open(bom_path, "wb") as f:
+                f.write(b"\xef\xbb\xbf" + data)
+            assert read_recipe(bom_path) == toml.load(open(self.path))
+
+    with it("raises error if recipe file does not exist"):
+        try:
+            read_recipe(os.path.join(dirpath, "files/nonexistent.toml"))
+        except IOError:
+            pass
+        else:
+            assert False, "must raise error"
+
+
+with description("read_recipe_cached") as self:
+    with before.each:
+        self.cache_home = tempfile.TemporaryDirectory()
+        self.old_cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = self.cache_home.name
+        self.path = os.path.join(self.cache_home.name, "recipe.toml")
+        with open(os.path.join(dirpath, "files/level2_recipe.toml"), "rb") as src:
+            with open(self.path, "wb") as dst:
+                dst.write(src.read())
+
+    with after.each:
+        if self.old_cache_home is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.old_cache_home
+        self.cache_home.cleanup()
+
+    with it("caches the parsed recipe"):
+        recipe = read_recipe_cached(self.path)
+        assert recipe == read_recipe(self.path)
+        assert len(os.listdir(os.path.join(self.cache_home.name, "pdftocgen"))) == 1
+        assert read_recipe_cached(self.path) == recipe
+
+    with it("invalidates the cache when the recipe changes"):
+        read_recipe_cached(self.path)
+        with open(self.path, "a") as f:
+            f.write("\n[[heading]]\nlevel = 3\n")
+        assert len(read_recipe_cached(self.path)['heading']) == 3
+
+    with it("keeps a single cache entry per recipe"):
+        read_recipe_cached(self.path)
+        with open(self.path, "a") as f:
+            f.write("\n[[heading]]\nlevel = 3\n")
+        read_recipe_cached(self.path)
+        assert len(os.listdir(os.path.join(self.cache_home.name, "pdftocgen"))) == 1
+
+    with it("leaves no temporary file behind if the cache can't be written"):
+        # a directory in the way of the cache entry makes the write fail
+        os.makedirs(_cache_path(self.path))
+        assert read_recipe_cached(self.path) == read_recipe(self.path)
+        assert os.listdir(os.path.join(self.cache_home.name, "pdftocgen")) == \
+            [os.path.basename(_cache_path(self.path))]
@@ -138,6 +138,18 @@ with description("gen_toc") as self:
     with it("generates 2-level toc correctly"):
         assert gen_toc(self.level2, self.level2_recipe) == self.level2_expect
 
+    with it("generates the same toc with multiple worker processes"):
+        assert gen_toc(
+            self.level2, self.level2_recipe, jobs=2
+        ) == self.level2_expect
+
+    with it("stays in process for unlocked encrypted documents"):
+        doc = fitz.open(os.path.join(dirpath, "files/level2_encrypted.pdf"))
+        assert doc.authenticate("u")
+        assert gen_toc(
+            doc, self.level2_recipe, jobs=2
+        ) == self.level2_expect
+
     with it("handles headings on same page correctly"):
         assert gen_toc(
             self.onepage, self.onepage_recipe
@@ -157,3 +169,12 @@ with description("gen_toc") as self:
         assert gen_toc(
             self.hardmode, self.hardmode_recipe
         ) == self.hardmode_expect
+
+
+with description("default recipe") as self:
+    with it("is in sync with recipes/default.toml"):
+        from pdftocgen._default_recipe import RECIPE
+        from pdftocgen.recipeio import read_recipe
+        assert RECIPE == read_recipe(
+            os.path.join(dirpath, "../recipes/default.toml")
+        )
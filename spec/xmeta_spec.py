@@ -1,9 +1,11 @@
+import io
 import os
 import fitz
 import toml
 
 from mamba import description, it, before
-from pdfxmeta import extract_meta, dump_meta, dump_toml
+from pdfxmeta import extract_meta, extract_meta_batch, dump_meta, dump_toml
+from pdfxmeta.pdfxmeta import generate_recipe_from_spans, write_recipe, _dump_size
 
 dirpath = os.path.dirname(os.path.abspath(__file__))
 
@@ -76,6 +78,29 @@ with description("extract_meta:") as self:
         assert 'font' in m
         assert 'CMBX12' in m['font']
 
+    with it("gives the same result when searching pages in parallel"):
+        meta = extract_meta(self.doc, "Section", jobs=2)
+        assert meta == extract_meta(self.doc, "Section", jobs=1)
+        assert len(meta) > 1
+
+with description("extract_meta_batch:") as self:
+    with before.all:
+        self.path = os.path.join(dirpath, "files/level2.pdf")
+        self.other = os.path.join(dirpath, "files/hardmode.pdf")
+
+    with it("extracts metadata from each file"):
+        meta = extract_meta_batch([self.path], "Section One", 1, jobs=1)
+        assert list(meta) == [self.path]
+        assert len(meta[self.path]) == 1
+        assert meta[self.path][0]['text'] == "Section One"
+
+    with it("gives the same result with worker processes"):
+        paths = [self.path, self.other]
+        meta = extract_meta_batch(paths, "section", ign_case=True, jobs=2)
+        assert list(meta) == paths
+        assert meta[self.path] != meta[self.other]
+        assert meta == extract_meta_batch(paths, "section", ign_case=True, jobs=1)
+
 with description("dump_meta:") as self:
     with before.all:
         self.doc = fitz.open(os.path.join(dirpath, "files/level2.pdf"))
@@ -186,3 +211,38 @@ with description("dump_toml:") as self:
         assert toml.loads(dump_toml(with_subset, 1)) == expected
         assert toml.loads(dump_toml(without_subset, 1)) == expected
         assert toml.loads(dump_toml(double_plus, 1)) == expected2
+
+    with it("keeps float sizes as floats after dumping an equal int"):
+        _dump_size(12)
+        assert _dump_size(12) == "12"
+        assert _dump_size(12.0) == "12.0"
+
+with description("generate_recipe_from_spans:") as self:
+    with before.all:
+        self.spans = [
+            {'size': 12.0, 'font': "B", 'color': 0, 'flags': 16,
+             'bbox': (0, 0, 1, 1), 'text': "b"},
+            {'size': 10.0, 'font': "A", 'color': 0, 'flags': 0,
+             'bbox': (0, 0, 1, 1), 'text': "a"},
+            {'size': 12.0, 'font': "C", 'color': 0, 'flags': 0,
+             'bbox': (0, 0, 1, 1), 'text': "c"},
+        ]
+
+    with it("produces one heading per font size, smallest first"):
+        recipe = toml.loads("\n".join(
+            generate_recipe_from_spans(self.spans)
+        ))
+        assert recipe['heading'] == [
+            {'level': 1, 'font': {'name': "A", 'size': 10.0}},
+            {'level': 2, 'font': {'name': "B", 'size': 12.0}},
+        ]
+
+    with it("returns [] when there are no spans"):
+        assert generate_recipe_from_spans([]) == []
+
+    with it("writes the same recipe to a file"):
+        out = io.StringIO()
+        write_recipe(self.spans, out)
+        assert out.getvalue() == "".join(
+            line + "\n" for line in generate_recipe_from_spans(self.spans)
+        )